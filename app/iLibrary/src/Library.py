@@ -1,14 +1,9 @@
-from os.path import join
-import paramiko
 import pyodbc
-import json
-from datetime import datetime, date
-from decimal import Decimal
+import threading
 from .getInfoForLibrary import *
 from .saveLibrary import *
 
 
-
 class Library(getInfoForLibrary, saveLibrary):
     """
     A class to manage libraries and files on an IBM i system.
@@ -16,6 +11,9 @@ class Library(getInfoForLibrary, saveLibrary):
     It provides methods to connect to the system via pyodbc for SQL and
     paramiko for SFTP transfers.
     """
+    # idle connections of connect_pool() objects, keyed by connection string
+    _pool: dict = {}
+    _pool_lock = threading.Lock()
 
     # ------------------------------------------------------
     # __init__ - initzialise the class
@@ -35,6 +33,57 @@ class Library(getInfoForLibrary, saveLibrary):
         self.db_host = db_host
         self.db_driver = db_driver
         self.db_password = db_password
+        self.conn = None
+        self.cursor = None
+        self._pooled = False
+        self._info_cache = {}
+        self._sftp = None
+        self._sftp_port = None
+        self._sftp_compress = None
+        self._procedure_installed = None
+        self._qcmdexec_cursor = None
+        self._db_lock = threading.RLock()
+        self._sftp_lock = threading.Lock()
+
+    # ------------------------------------------------------
+    # connect_pool - create a Library with a pooled connection
+    # ------------------------------------------------------
+    @classmethod
+    def connect_pool(cls, db_user: str, db_password: str, db_host: str, db_driver: str) -> 'Library':
+        """
+        Creates a Library that takes its database connection from a pool of open
+        connections and hands it back on exit instead of closing it. Scripts that
+        open several 'with' blocks one after the other then only connect once.
+
+        Args:
+            db_user (str): The user ID for the database connection.
+            db_password (str): The password for the database user.
+            db_host (str): The system/host name for the database connection.
+            db_driver (str): The ODBC driver to be used.
+
+        Returns:
+            Library: The object, to be used in a 'with' block like the constructor.
+        """
+        lib = cls(db_user, db_password, db_host, db_driver)
+        lib._pooled = True
+        return lib
+
+    # ------------------------------------------------------
+    # close_pool - close all pooled connections
+    # ------------------------------------------------------
+    @classmethod
+    def close_pool(cls):
+        """
+        Closes all idle connections that were handed back by connect_pool() objects.
+        """
+        with Library._pool_lock:
+            connections = [conn for idle in Library._pool.values() for conn in idle]
+            Library._pool.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except pyodbc.Error:
+                pass
 
     # ------------------------------------------------------
     # __enter__ - enter to the class
@@ -50,23 +99,76 @@ class Library(getInfoForLibrary, saveLibrary):
                 f"UID={self.db_user};"
                 f"PWD={self.db_password};"
             )
-            self.conn = pyodbc.connect(conn_str, autocommit=True)
+            self._conn_str = conn_str
+            self.conn = self.__take_pooled(conn_str) if self._pooled else None
+            if self.conn is None:
+                # every CL command takes effect on its own, so there is no
+                # transaction to commit or roll back
+                self.conn = pyodbc.connect(conn_str, autocommit=True)
+            # one cursor for the lifetime of the connection, so the statement
+            # handle is not allocated again for every call
+            self.cursor = self.conn.cursor()
+            # QTEMP.ILIBSAVE is checked again for every connection
+            self._procedure_installed = None
+            self._qcmdexec_cursor = None
             return self
         except pyodbc.Error as ex:
             sqlstate = ex.args[0]
             print(f"Database connection failed with error: {sqlstate}")
             raise
 
+    # ------------------------------------------------------
+    # __take_pooled - get an idle connection from the pool
+    # ------------------------------------------------------
+    @staticmethod
+    def __take_pooled(conn_str: str):
+        """
+        Returns an open idle connection for the connection string, or None.
+        """
+        with Library._pool_lock:
+            idle = Library._pool.get(conn_str, [])
+            while idle:
+                conn = idle.pop()
+                if not conn.closed:
+                    return conn
+        return None
+
     # ------------------------------------------------------
     # __exit__ - leave the class
     # ------------------------------------------------------
     def __exit__(self, exc_type, exc_val, exc_tb):
         """
-        Closes the database connection when exiting a 'with' block.
+        Closes the SSH session and the database connection when exiting a 'with' block.
         This method is called automatically, even if an error occurred.
         """
-        self.iclose()
+        self.close()
 
+    # ------------------------------------------------------
+    # close - close the SSH session and the connection
+    # ------------------------------------------------------
+    def close(self):
+        """
+        Closes the SSH session that is kept open between save file downloads
+        and the database connection. Useful for manual closure.
+        """
+        with self._sftp_lock:
+            self._close_sftp()
+        for cursor in (self._qcmdexec_cursor, self.cursor):
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except pyodbc.Error:
+                    pass
+        self._qcmdexec_cursor = None
+        self.cursor = None
+        if self.conn and not self.conn.closed:
+            if self._pooled:
+                # hand the connection back instead of closing it
+                with Library._pool_lock:
+                    Library._pool.setdefault(self._conn_str, []).append(self.conn)
+                self.conn = None
+            else:
+                self.conn.close()
 
     # ------------------------------------------------------
     # iClose - close connection
@@ -74,7 +176,6 @@ class Library(getInfoForLibrary, saveLibrary):
     def iclose(self):
         """
         A helper method to close the connection, also useful for manual closure.
+        Same as close().
         """
-        if self.conn and not self.conn.closed:
-            self.conn.close()
-            pass
\ No newline at end of file
+        self.close()
@@ -1,9 +1,223 @@
 from os.path import join
 import paramiko
 import pyodbc
-import json
-from datetime import datetime, date
+import orjson
+import io
+import time
+from typing import BinaryIO, Union
 from decimal import Decimal
+
+# number of rows pulled from the ODBC driver per fetchmany() call
+_FETCH_SIZE = 1000
+# seconds a getLibraryInfo result is answered from the cache
+_INFO_CACHE_TTL = 30
+# maximum number of cached getLibraryInfo results
+_INFO_CACHE_SIZE = 256
+
+# column titles of QSYS2.LIBRARY_INFO
+_LIBRARY_INFO_COLS = (
+    'OBJECT_COUNT',
+    'LIBRARY_SIZE',
+    'LIBRARY_SIZE_COMPLETE',
+    'LIBRARY_TYPE',
+    'TEXT_DESCRIPTION',
+    'IASP_NAME',
+    'IASP_NUMBER',
+    'CREATE_AUTHORITY',
+    'OBJECT_AUDIT_CREATE',
+    'JOURNALED',
+    'JOURNAL_LIBRARY',
+    'JOURNAL_NAME',
+    'INHERIT_JOURNALING',
+    'JOURNAL_INHERIT_RULES',
+    'JOURNAL_START_TIMESTAMP',
+    'APPLY_STARTING_RECEIVER_LIBRARY',
+    'APPLY_STARTING_RECEIVER',
+    'APPLY_STARTING_RECEIVER_ASP',
+)
+
+# column titles of QSYS2.OBJECT_STATISTICS
+_OBJSTAT_COLS = (
+    'OBJNAME',
+    'OBJTYPE',
+    'OBJOWNER',
+    'OBJDEFINER',
+    'OBJCREATED',
+    'OBJSIZE',
+    'OBJTEXT',
+    'OBJLONGNAME',
+    'LAST_USED_TIMESTAMP',
+    'LAST_USED_OBJECT',
+    'DAYS_USED_COUNT',
+    'LAST_RESET_TIMESTAMP',
+    'IASP_NUMBER',
+    'IASP_NAME',
+    'OBJATTRIBUTE',
+    'OBJLONGSCHEMA',
+    'TEXT',
+    'SQL_OBJECT_TYPE',
+    'OBJLIB',
+    'CHANGE_TIMESTAMP',
+    'USER_CHANGED',
+    'SOURCE_FILE',
+    'SOURCE_LIBRARY',
+    'SOURCE_MEMBER',
+    'SOURCE_TIMESTAMP',
+    'CREATED_SYSTEM',
+    'CREATED_SYSTEM_VERSION',
+    'LICENSED_PROGRAM',
+    'LICENSED_PROGRAM_VERSION',
+    'COMPILER',
+    'COMPILER_VERSION',
+    'OBJECT_CONTROL_LEVEL',
+    'BUILD_ID',
+    'PTF_NUMBER',
+    'APAR_ID',
+    'USER_DEFINED_ATTRIBUTE',
+    'ALLOW_CHANGE_BY_PROGRAM',
+    'CHANGED_BY_PROGRAM',
+    'COMPRESSED',
+    'PRIMARY_GROUP',
+    'STORAGE_FREED',
+    'ASSOCIATED_SPACE_SIZE',
+    'OPTIMUM_SPACE_ALIGNMENT',
+    'OVERFLOW_STORAGE',
+    'OBJECT_DOMAIN',
+    'OBJECT_AUDIT',
+    'OBJECT_SIGNED',
+    'SYSTEM_TRUSTED_SOURCE',
+    'MULTIPLE_SIGNATURES',
+    'SAVE_TIMESTAMP',
+    'RESTORE_TIMESTAMP',
+    'SAVE_WHILE_ACTIVE_TIMESTAMP',
+    'SAVE_COMMAND',
+    'SAVE_DEVICE',
+    'SAVE_FILE_NAME',
+    'SAVE_FILE_LIBRARY',
+    'SAVE_VOLUME',
+    'SAVE_LABEL',
+    'SAVE_SEQUENCE_NUMBER',
+    'LAST_SAVE_SIZE',
+    'JOURNALED',
+    'JOURNAL_NAME',
+    'JOURNAL_LIBRARY',
+    'JOURNAL_IMAGES',
+    'OMIT_JOURNAL_ENTRY',
+    'REMOTE_JOURNAL_FILTER',
+    'JOURNAL_START_TIMESTAMP',
+    'APPLY_STARTING_RECEIVER',
+    'APPLY_STARTING_RECEIVER_LIBRARY',
+    'AUTHORITY_COLLECTION_VALUE',
+)
+
+# column titles of QSYS2.SYSMEMBERSTAT
+_SYSMEMBERSTAT_COLS = (
+    'TABLE_SCHEMA',
+    'TABLE_NAME',
+    'SYSTEM_TABLE_SCHEMA',
+    'SYSTEM_TABLE_NAME',
+    'SYSTEM_TABLE_MEMBER',
+    'SOURCE_TYPE',
+    'LAST_SOURCE_UPDATE_TIMESTAMP',
+    'TEXT_DESCRIPTION',
+    'CREATE_TIMESTAMP',
+    'LAST_CHANGE_TIMESTAMP',
+    'LAST_SAVE_TIMESTAMP',
+    'LAST_RESTORE_TIMESTAMP',
+    'LAST_USED_TIMESTAMP',
+    'DAYS_USED_COUNT',
+    'LAST_RESET_TIMESTAMP',
+    'TABLE_PARTITION',
+    'PARTITION_TYPE',
+    'PARTITION_NUMBER',
+    'NUMBER_DISTRIBUTED_PARTITIONS',
+    'NUMBER_PARTITIONING_KEYS',
+    'PARTITIONING_KEYS',
+    'LOWINCLUSIVE',
+    'LOWVALUE',
+    'HIGHINCLUSIVE',
+    'HIGHVALUE',
+    'NUMBER_ROWS',
+    'NUMBER_PAGES',
+    'OVERFLOW',
+    'AVGROWSIZE',
+    'NUMBER_DELETED_ROWS',
+    'DATA_SIZE',
+    'VARIABLE_LENGTH_SIZE',
+    'VARIABLE_LENGTH_SEGMENTS',
+    'COLUMN_STATS_SIZE',
+    'MAINTAINED_TEMPORARY_INDEX_SIZE',
+    'NUMBER_DISTINCT_INDEXES',
+    'OPEN_OPERATIONS',
+    'CLOSE_OPERATIONS',
+    'INSERT_OPERATIONS',
+    'BLOCKED_INSERT_OPERATIONS',
+    'BLOCKED_INSERT_ROWS',
+    'UPDATE_OPERATIONS',
+    'DELETE_OPERATIONS',
+    'CLEAR_OPERATIONS',
+    'COPY_OPERATIONS',
+    'REORGANIZE_OPERATIONS',
+    'INDEX_BUILDS',
+    'LOGICAL_READS',
+    'PHYSICAL_READS',
+    'SEQUENTIAL_READS',
+    'RANDOM_READS',
+    'NEXT_IDENTITY_VALUE',
+    'KEEP_IN_MEMORY',
+    'MEDIA_PREFERENCE',
+    'VOLATILE',
+    'PARTIAL_TRANSACTION',
+    'APPLY_STARTING_RECEIVER_LIBRARY',
+    'APPLY_STARTING_RECEIVER',
+)
+
+# DECIMAL columns, returned as strings by the server
+_DECIMAL_COLS = frozenset({'OBJSIZE', 'LAST_SAVE_SIZE'})
+# format of the timestamp columns, formatted by the server
+_TIMESTAMP_FORMAT = 'YYYY-MM-DD HH24:MI:SS'
+
+
+# ------------------------------------------------------
+# _select_list - build the SELECT list for a title tuple
+# ------------------------------------------------------
+def _select_list(cols: tuple) -> str:
+    """
+    Builds an explicit SELECT list for the given columns. Timestamp and
+    DECIMAL columns are converted to VARCHAR by DB2, so pyodbc hands back
+    plain strings and no conversion is needed on the Python side.
+    """
+    items = []
+    for col in cols:
+        if col == 'OBJCREATED' or col.endswith('TIMESTAMP'):
+            items.append(f"VARCHAR_FORMAT({col}, '{_TIMESTAMP_FORMAT}') AS {col}")
+        elif col in _DECIMAL_COLS:
+            items.append(f"CAST({col} AS VARCHAR(32)) AS {col}")
+        else:
+            items.append(col)
+    return ", ".join(items)
+
+
+# explicit select lists, so only the columns above travel over the wire
+# and the column order always matches the titles
+_OBJSTAT_COLS_SQL = _select_list(_OBJSTAT_COLS)
+_SYSMEMBERSTAT_COLS_SQL = _select_list(_SYSMEMBERSTAT_COLS)
+
+
+# ------------------------------------------------------
+# _default - orjson fallback for types it can't encode
+# ------------------------------------------------------
+def _default(value):
+    """
+    Fallback serializer for orjson. datetime/date are handled natively,
+    so only Decimal values from DB2 that are not already cast to VARCHAR
+    in the SELECT list have to be converted here.
+    """
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError
+
+
 class getInfoForLibrary:
     """
     A class to show libraries and files on an IBM i system.
@@ -31,11 +245,57 @@ class getInfoForLibrary:
         if len(library) > 10:
             raise ValueError("The library name is too long. Maximum length is 10.")
 
-        # Select the information about the Library
-        sql_query = f"SELECT * FROM TABLE(QSYS2.LIBRARY_INFO(upper('{library}')))"
+        lib_u = library.upper()
+        # answer repeated calls from the cache, as long as the entry is fresh
+        key = (lib_u, wantJson)
+        # the cache is shared by all threads using this Library
+        with self._db_lock:
+            cached = self._info_cache.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1]
+
+            result = self.__queryLibraryInfo(library, lib_u, wantJson)
+            if result is not None:
+                if len(self._info_cache) >= _INFO_CACHE_SIZE:
+                    # drop the oldest entry
+                    self._info_cache.pop(next(iter(self._info_cache)))
+                self._info_cache[key] = (time.monotonic() + _INFO_CACHE_TTL, result)
+        return result
+
+    # ------------------------------------------------------
+    # invalidate_info_cache - forget cached library infos
+    # ------------------------------------------------------
+    def invalidate_info_cache(self, library: str = None):
+        """
+        Removes cached results of getLibraryInfo, e.g. after a library was changed.
+
+        Args:
+            library (str, optional): Only forget the entries of this library.
+                                     Defaults to None, which clears the whole cache.
+        """
+        with self._db_lock:
+            if library is None:
+                self._info_cache.clear()
+                return
+            lib_u = library.upper()
+            for key in [key for key in self._info_cache if key[0] == lib_u]:
+                del self._info_cache[key]
+
+    # ------------------------------------------------------
+    # __queryLibraryInfo - run the LIBRARY_INFO query
+    # ------------------------------------------------------
+    def __queryLibraryInfo(self, library: str, lib_u: str, wantJson: bool):
+        """
+        Queries QSYS2.LIBRARY_INFO for getLibraryInfo, without using the cache.
+        """
+        # Select the information about the Library, the library is bound as
+        # parameter so DB2 can reuse the access plan from the plan cache.
+        # It is uppercased by the caller instead of with UPPER() on the server
+        sql_query = "SELECT * FROM TABLE(QSYS2.LIBRARY_INFO(CAST(? AS VARCHAR(10))))"
         try:
-            with self.conn.cursor() as cursor:
-                cursor.execute(sql_query)
+            with self._db_lock:
+                cursor = self.cursor
+                cursor.execute(sql_query, lib_u)
                 rows = cursor.fetchall()
                 # Check if any row was returned
                 if not rows:
@@ -43,7 +303,7 @@ class getInfoForLibrary:
                         rowsTitle = ['error']
                         errorString = f'No data found for library for Library: {library}'
                         row_to_dict = dict(zip(rowsTitle, [errorString]))
-                        getJSON_String = json.dumps(row_to_dict, indent=4)
+                        getJSON_String = orjson.dumps(row_to_dict, option=orjson.OPT_INDENT_2).decode()
                         return getJSON_String
                     tmpReturnTuple: tuple = ('error', 'No data found for library')
                     return tmpReturnTuple
@@ -51,31 +311,10 @@ class getInfoForLibrary:
                 # Get the single tuple from the list of rows
                 row_tuple = rows[0]
                 if wantJson:
-                    rowsTitle = [
-                        'OBJECT_COUNT',
-                        'LIBRARY_SIZE',
-                        'LIBRARY_SIZE_COMPLETE',
-                        'LIBRARY_TYPE',
-                        'TEXT_DESCRIPTION',
-                        'IASP_NAME',
-                        'IASP_NUMBER',
-                        'CREATE_AUTHORITY',
-                        'OBJECT_AUDIT_CREATE',
-                        'JOURNALED',
-                        'JOURNAL_LIBRARY',
-                        'JOURNAL_NAME',
-                        'INHERIT_JOURNALING',
-                        'JOURNAL_INHERIT_RULES',
-                        'JOURNAL_START_TIMESTAMP',
-                        'APPLY_STARTING_RECEIVER_LIBRARY',
-                        'APPLY_STARTING_RECEIVER',
-                        'APPLY_STARTING_RECEIVER_ASP'
-                    ]
-
                     # Zip the list of titles with the single row tuple
-                    row_to_dict = dict(zip(rowsTitle, row_tuple))
+                    row_to_dict = dict(zip(_LIBRARY_INFO_COLS, row_tuple))
 
-                    getJSON_String = json.dumps(row_to_dict, indent=4)
+                    getJSON_String = orjson.dumps(row_to_dict, default=_default, option=orjson.OPT_INDENT_2).decode()
                     return getJSON_String
 
                 # if wantJSON false, return back a tuple
@@ -88,188 +327,57 @@ class getInfoForLibrary:
     # ------------------------------------------------------
     # getFileInfo - get all Files and Infos from a Lib
     # ------------------------------------------------------
-    def getFileInfo(self, library:str, qFiles:bool=False) -> str:
+    def getFileInfo(self, library:str, qFiles:bool=False, out:BinaryIO=None) -> Union[str, bool]:
         """
         getFileInfo - get all Files and Infos from a Lib
         :param library: The name of the library where the save file will be created.
         :param qFiles: If true, get all Files and Infos from Source Physical File
+        :param out: Optional binary stream (e.g. an open file). If given, the JSON is
+                    written to it row by row instead of being returned as a string.
         :return:
             str: A Json String with all Files and Infos from a Library
+            bool: True if the JSON was written to `out`, False on error
         """
         if not library:
             raise ValueError("A library name is required.")
 
 
         try:
-            with self.conn.cursor() as cursor:
-                # execute the Command for deleting a Savefile.
+            with self._db_lock:
+                cursor = self.cursor
                 if not qFiles:
-                    row_title = [
-                        'OBJNAME',
-                        'OBJTYPE',
-                        'OBJOWNER',
-                        'OBJDEFINER',
-                        'OBJCREATED',
-                        'OBJSIZE',
-                        'OBJTEXT',
-                        'OBJLONGNAME',
-                        'LAST_USED_TIMESTAMP',
-                        'LAST_USED_OBJECT',
-                        'DAYS_USED_COUNT',
-                        'LAST_RESET_TIMESTAMP',
-                        'IASP_NUMBER',
-                        'IASP_NAME',
-                        'OBJATTRIBUTE',
-                        'OBJLONGSCHEMA',
-                        'TEXT',
-                        'SQL_OBJECT_TYPE',
-                        'OBJLIB',
-                        'CHANGE_TIMESTAMP',
-                        'USER_CHANGED',
-                        'SOURCE_FILE',
-                        'SOURCE_LIBRARY',
-                        'SOURCE_MEMBER',
-                        'SOURCE_TIMESTAMP',
-                        'CREATED_SYSTEM',
-                        'CREATED_SYSTEM_VERSION',
-                        'LICENSED_PROGRAM',
-                        'LICENSED_PROGRAM_VERSION',
-                        'COMPILER',
-                        'COMPILER_VERSION',
-                        'OBJECT_CONTROL_LEVEL',
-                        'BUILD_ID',
-                        'PTF_NUMBER',
-                        'APAR_ID',
-                        'USER_DEFINED_ATTRIBUTE',
-                        'ALLOW_CHANGE_BY_PROGRAM',
-                        'CHANGED_BY_PROGRAM',
-                        'COMPRESSED',
-                        'PRIMARY_GROUP',
-                        'STORAGE_FREED',
-                        'ASSOCIATED_SPACE_SIZE',
-                        'OPTIMUM_SPACE_ALIGNMENT',
-                        'OVERFLOW_STORAGE',
-                        'OBJECT_DOMAIN',
-                        'OBJECT_AUDIT',
-                        'OBJECT_SIGNED',
-                        'SYSTEM_TRUSTED_SOURCE',
-                        'MULTIPLE_SIGNATURES',
-                        'SAVE_TIMESTAMP',
-                        'RESTORE_TIMESTAMP',
-                        'SAVE_WHILE_ACTIVE_TIMESTAMP',
-                        'SAVE_COMMAND',
-                        'SAVE_DEVICE',
-                        'SAVE_FILE_NAME',
-                        'SAVE_FILE_LIBRARY',
-                        'SAVE_VOLUME',
-                        'SAVE_LABEL',
-                        'SAVE_SEQUENCE_NUMBER',
-                        'LAST_SAVE_SIZE',
-                        'JOURNALED',
-                        'JOURNAL_NAME',
-                        'JOURNAL_LIBRARY',
-                        'JOURNAL_IMAGES',
-                        'OMIT_JOURNAL_ENTRY',
-                        'REMOTE_JOURNAL_FILTER',
-                        'JOURNAL_START_TIMESTAMP',
-                        'APPLY_STARTING_RECEIVER',
-                        'APPLY_STARTING_RECEIVER_LIBRARY',
-                        'AUTHORITY_COLLECTION_VALUE'
-                    ]
                     #generate Normal CMD Command
-                    cmdString = f"SELECT * FROM TABLE (QSYS2.OBJECT_STATISTICS('{library}','*ALL') ) AS X"
-
-                if qFiles:
-                    cmdString = f"SELECT * FROM QSYS2.SYSMEMBERSTAT WHERE SYSTEM_TABLE_SCHEMA = '{library}' AND SOURCE_TYPE IS NOT NULL ORDER BY SYSTEM_TABLE_MEMBER"
-                    row_title = [
-                        'TABLE_SCHEMA',
-                        'TABLE_NAME',
-                        'SYSTEM_TABLE_SCHEMA',
-                        'SYSTEM_TABLE_NAME',
-                        'SYSTEM_TABLE_MEMBER',
-                        'SOURCE_TYPE',
-                        'LAST_SOURCE_UPDATE_TIMESTAMP',
-                        'TEXT_DESCRIPTION',
-                        'CREATE_TIMESTAMP',
-                        'LAST_CHANGE_TIMESTAMP',
-                        'LAST_SAVE_TIMESTAMP',
-                        'LAST_RESTORE_TIMESTAMP',
-                        'LAST_USED_TIMESTAMP',
-                        'DAYS_USED_COUNT',
-                        'LAST_RESET_TIMESTAMP',
-                        'TABLE_PARTITION',
-                        'PARTITION_TYPE',
-                        'PARTITION_NUMBER',
-                        'NUMBER_DISTRIBUTED_PARTITIONS',
-                        'NUMBER_PARTITIONING_KEYS',
-                        'PARTITIONING_KEYS',
-                        'LOWINCLUSIVE',
-                        'LOWVALUE',
-                        'HIGHINCLUSIVE',
-                        'HIGHVALUE',
-                        'NUMBER_ROWS',
-                        'NUMBER_PAGES',
-                        'OVERFLOW',
-                        'AVGROWSIZE',
-                        'NUMBER_DELETED_ROWS',
-                        'DATA_SIZE',
-                        'VARIABLE_LENGTH_SIZE',
-                        'VARIABLE_LENGTH_SEGMENTS',
-                        'COLUMN_STATS_SIZE',
-                        'MAINTAINED_TEMPORARY_INDEX_SIZE',
-                        'NUMBER_DISTINCT_INDEXES',
-                        'OPEN_OPERATIONS',
-                        'CLOSE_OPERATIONS',
-                        'INSERT_OPERATIONS',
-                        'BLOCKED_INSERT_OPERATIONS',
-                        'BLOCKED_INSERT_ROWS',
-                        'UPDATE_OPERATIONS',
-                        'DELETE_OPERATIONS',
-                        'CLEAR_OPERATIONS',
-                        'COPY_OPERATIONS',
-                        'REORGANIZE_OPERATIONS',
-                        'INDEX_BUILDS',
-                        'LOGICAL_READS',
-                        'PHYSICAL_READS',
-                        'SEQUENTIAL_READS'
-                        'RANDOM_READS',
-                        'NEXT_IDENTITY_VALUE',
-                        'KEEP_IN_MEMORY',
-                        'MEDIA_PREFERENCE',
-                        'VOLATILE',
-                        'PARTIAL_TRANSACTION',
-                        'APPLY_STARTING_RECEIVER_LIBRARY',
-                        'APPLY_STARTING_RECEIVER'
-                    ]
+                    cmdString = f"SELECT {_OBJSTAT_COLS_SQL} FROM TABLE (QSYS2.OBJECT_STATISTICS(?, '*ALL') ) AS X"
+                else:
+                    cmdString = f"SELECT {_SYSMEMBERSTAT_COLS_SQL} FROM QSYS2.SYSMEMBERSTAT WHERE SYSTEM_TABLE_SCHEMA = ? AND SOURCE_TYPE IS NOT NULL ORDER BY SYSTEM_TABLE_MEMBER"
 
-                cursor.execute(cmdString)
+                cursor.arraysize = _FETCH_SIZE
+                # the catalog stores library names in upper case
+                cursor.execute(cmdString, library.upper())
+                # take the keys from the result set itself, so they always
+                # match the columns that were actually returned
+                row_title = tuple(column[0] for column in cursor.description)
 
-
-                result_list = []
-                rows = cursor.fetchall()
-                if len(rows) == 0:
+                # stream the rows in batches and encode each batch right away,
+                # so only one batch of rows is held in memory at any time.
+                # timestamps and DECIMAL columns already arrive as strings,
+                # so the rows can be encoded as-is
+                stream = out if out is not None else io.BytesIO()
+                row_count = 0
+                while True:
+                    batch = cursor.fetchmany(_FETCH_SIZE)
+                    if not batch:
+                        break
+                    stream.write(b",\n" if row_count else b"[\n")
+                    stream.write(b",\n".join([orjson.dumps(dict(zip(row_title, row)), default=_default) for row in batch]))
+                    row_count += len(batch)
+                if not row_count:
                     return f'No Files Found in Library: {library}'
-                for row in rows:
-                    # 1. Create the dictionary for the current row
-                    row_dict = dict(zip(row_title, row))
-
-                    # 2. Iterate through the dictionary's items to find and convert datetimes
-                    for key, value in row_dict.items():
-                        if isinstance(value, (datetime, date)):
-                            # Convert the datetime object to a standardized ISO 8601 string
-                            row_dict[key] = value.isoformat()
-                        elif isinstance(value, Decimal):
-                            row_dict[key] = str(value)
-
-                    # 3. Append the now JSON-safe dictionary to the list
-                    result_list.append(row_dict)
+                stream.write(b"\n]")
 
-                # Convert the list of dictionaries into a JSON string
-                json_string = json.dumps(result_list, indent=4)
+                json_string = stream.getvalue().decode() if out is None else True
         except Exception as e:
             print(f"An error occurred while executing command, with showing Lib Files: {e}")
-            self.conn.rollback()
             return False
         else:
-            self.conn.commit()
             return json_string
@@ -1,13 +1,127 @@
 from _ast import Raise
 from os.path import join
+from posixpath import join as ifs_join
 import paramiko
 import pyodbc
 import json
 from datetime import datetime, date
 from decimal import Decimal
 from typing import Union
+import socket
+import threading
+import shlex
+import mmap
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+# TCP buffer size of the SSH socket used for downloading save files; 8 MiB
+# covers the bandwidth-delay product of fast WAN links and is the largest
+# size macOS accepts by default
+_SOCK_BUFSIZE = 8 << 20
+# SSH channel window and packet size for the save file download
+_SSH_WINDOW_SIZE = 2 ** 31 - 1
+_SSH_MAX_PACKET_SIZE = 32768
+# seconds between keepalive packets on the cached SSH connection
+_SSH_KEEPALIVE = 30
+# block size for reading the save file over SFTP, a multiple of the request size
+_SFTP_CHUNK_SIZE = 1 << 20
+# bytes requested ahead of the reader with prefetch=False; the reads themselves
+# stay at _SFTP_CHUNK_SIZE, since paramiko joins the blocks of one read by
+# appending to a bytes object, which gets slow for large reads
+_SFTP_WINDOW = 32 << 20
+# size of a single SFTP read request; 32 KiB is the largest size every
+# SFTP server must accept, the prefetch keeps many of them in flight
+_SFTP_REQUEST_SIZE = 32768
+# buffer size of the remote SFTP file object
+_SFTP_BUFSIZE = 32768
+# downloads of one save file before giving up on a broken connection
+_DOWNLOAD_ATTEMPTS = 3
+# errors of a broken connection, after which the download is tried again;
+# paramiko raises EOFError when the connection closes during a read
+_TRANSIENT_ERRORS = (paramiko.ssh_exception.SSHException, paramiko.sftp.SFTPError,
+                     EOFError, socket.timeout, ConnectionError)
+# seconds the SFTP channel waits for data before giving up
+_SFTP_TIMEOUT = 120
+# number of byte ranges of one save file that are downloaded in parallel
+_SFTP_WORKERS = 8
+# smallest byte range worth its own download thread
+_SFTP_MIN_PART_SIZE = 8 << 20
+
+# target releases accepted for TGTRLS, anything else saves for *CURRENT
+_TGTRLS = frozenset({
+    "V1R1M0", "V1R1M2", "V1R2M0", "V1R3M0", "V2R1M0", "V2R1M1",
+    "V2R2M0", "V2R3M0", "V3R0M5", "V3R1M0", "V3R2M0", "V3R6M0",
+    "V3R7M0", "V4R1M0", "V4R2M0", "V4R3M0", "V4R4M0", "V4R5M0",
+    "V5R1M0", "V5R2M0", "V5R3M0", "V5R4M0", "V6R1M0", "V6R1M1",
+    "V7R1M0", "V7R2M0", "V7R3M0", "V7R4M0", "V7R5M0", "V7R6M0",
+})
+# devices accepted for SAVLIB DEV
+_SAVLIB_DEVICES = frozenset({'*SAVF', '*MEDDFN'})
+
+# CL command templates, filled with str.format_map()
+_CRTSAVF = "CRTSAVF FILE({lib}/{f}) TEXT('{desc}')"
+_SAVLIB = "SAVLIB LIB({lib}) DEV({dev}){opts} SAVF({to}/{f}) TGTRLS({ver})"
+_QSYS_SAVF_PATH = "/QSYS.LIB/{to}.LIB/{f}.FILE"
+_CPYTOSTMF = "CPYTOSTMF FROMMBR('" + _QSYS_SAVF_PATH + "') TOSTMF('{path}') STMFOPT(*REPLACE)"
+_RMSTMF = "QSH CMD('rm -r {path}')"
+_DLTF = "DLTF FILE({lib}/{f})"
+
+# procedure in QTEMP running CRTSAVF and SAVLIB of one save; created once
+# per connection
+_ILIBSAVE_PROCEDURE = """
+    CREATE OR REPLACE PROCEDURE QTEMP.ILIBSAVE (
+        IN P_CRTSAVF VARCHAR(5000),
+        IN P_SAVLIB VARCHAR(5000))
+    LANGUAGE SQL
+    MODIFIES SQL DATA
+    BEGIN
+        CALL QSYS2.QCMDEXC(P_CRTSAVF);
+        CALL QSYS2.QCMDEXC(P_SAVLIB);
+    END
+"""
+_ILIBSAVE_CALL = "CALL QTEMP.ILIBSAVE(?, ?)"
+
+
+# ------------------------------------------------------
+# _ShortReadError - the remote file is shorter than its size
+# ------------------------------------------------------
+class _ShortReadError(Exception):
+    """
+    Raised when the remote file ends before the size reported by stat(). The
+    same file ends early again on the next attempt, so it is not retried.
+    """
+
+
+# ------------------------------------------------------
+# _cl_quote - escape a value for a quoted CL string
+# ------------------------------------------------------
+def _cl_quote(value: str) -> str:
+    """
+    Doubles single quotes, so the value can be placed between quotes in a
+    CL command without ending the string early.
+    """
+    return value.replace("'", "''")
+
+
+# ------------------------------------------------------
+# _qcmdexc_block - run several CL commands in one statement
+# ------------------------------------------------------
+def _qcmdexc_block(*commands: str) -> str:
+    """
+    Builds a dynamic compound statement that runs the CL commands one after
+    the other through QCMDEXC. The commands are embedded as SQL string
+    literals, since a compound statement takes no parameter markers; SQL
+    escapes quotes the same way as CL, by doubling them.
+    """
+    calls = " ".join(f"CALL QSYS2.QCMDEXC('{_cl_quote(command)}');" for command in commands)
+    return f"BEGIN {calls} END"
+
 
 class saveLibrary:
+    # statement for running a CL command; always the same text on its own
+    # cursor, so pyodbc prepares it only once and just binds each command
+    _qcmd_sql = "CALL QSYS2.QCMDEXC(?)"
+
     # ------------------------------------------------------
     # saveLibrary - creating a Savefile and sending to the
     #               IFS
@@ -29,7 +143,12 @@ class saveLibrary:
                     asp: Union[int, str, None] = None,
                     waitFile: Union[int, str, None] = None,
                     share: str = None,
-                    authority: str = None
+                    authority: str = None,
+                    transfer: str = 'sftp',
+                    prefetch: bool = True,
+                    chunk_size: int = _SFTP_WINDOW,
+                    verify: bool = False,
+                    compress: bool = False
                 ) -> bool:
         """
             Saves a complete library from the IBM i to a save file.
@@ -50,24 +169,31 @@ class saveLibrary:
                                            Required if `getZip` is True. Defaults to None.
                 remPath (str, optional): The remote file path on the IBM i's IFS where the
                                          save file will be temporarily stored before downloading.
-                                         Required if `getZip` is True. Defaults to None.
+                                         If None, the save file is read directly from QSYS.LIB
+                                         without an IFS copy. Defaults to None.
                 getZip (bool, optional): If True, the save file will be downloaded to the local machine
                                          and then deleted from the remote IFS. Defaults to False.
                 port (int, optional): The port for the SSH connection. Defaults to 22.
                 remSavf (bool, optional): If True, the save file will be automatacly removed from the remote after downloading.
                 version (str): The version of the save file. Defaults to *CURRENT.
                 max_records (int, str, optional): The maximum number of records to return. Defaults to *NOMAX. (*NOMAX, 1 - 4293525600)
+                transfer (str, optional): How the save file is downloaded. 'sftp' downloads it in parallel
+                                          parts over SFTP, 'ssh' streams it through a single `cat` on an SSH
+                                          channel and removes the IFS copy in the same command. Defaults to 'sftp'.
+                prefetch (bool, optional): If False, the SFTP download only requests `chunk_size` bytes ahead
+                                           instead of the whole save file, for very large save files. Defaults to True.
+                chunk_size (int, optional): The number of bytes the SFTP download requests ahead with
+                                            `prefetch=False`. Defaults to 32 MiB.
+                verify (bool, optional): If True, the SHA-256 checksum of the save file is computed on the IBM i
+                                         during the download, on an SSH connection of its own, and compared with
+                                         the checksum of the downloaded data. Defaults to False.
+                compress (bool, optional): If True, the SSH connection of the download is compressed with zlib.
+                                           This helps on slow links with a save file that was not compressed
+                                           on the IBM i, and costs CPU time on fast links. Defaults to False.
             Returns:
                 bool: True if the library was saved successfully (and downloaded if requested),
                       False otherwise.
         """
-        # Target Release List
-        trgList:list = ["V1R1M0", "V1R1M2", "V1R2M0", "V1R3M0", "V2R1M0", "V2R1M1",
-                        "V2R2M0", "V2R3M0", "V3R0M5", "V3R1M0", "V3R2M0", "V3R6M0",
-                        "V3R7M0", "V4R1M0", "V4R2M0", "V4R3M0", "V4R4M0", "V4R5M0",
-                        "V5R1M0", "V5R2M0", "V5R3M0", "V5R4M0", "V6R1M0", "V6R1M1",
-                        "V7R1M0", "V7R2M0", "V7R3M0", "V7R4M0", "V7R5M0", "V7R6M0"]
-
         # check if something missing from the Arguments
         #check if Library is empty or not
         if not library:
@@ -78,106 +204,297 @@ class saveLibrary:
         #check if toLibrary is empty or not
         if not toLibrary:
             toLibrary = library
+        # uppercase the object names once, they are used in several commands
+        to_u = toLibrary.upper().strip()
+        savf_u = saveFileName.upper().strip()
         #check if user want the SaveFile as ZIP File
         if getZip:
-            if not remPath:
-                raise ValueError("A remote path is required. Use 'remPath' instead.")
-            elif remPath[-1] == '/':
+            if transfer not in ('sftp', 'ssh'):
+                raise ValueError("The transfer must be 'sftp' or 'ssh'.")
+            if chunk_size <= 0:
+                raise ValueError("The chunk_size must be greater than 0.")
+            if remPath and remPath[-1] == '/':
                 remPath = remPath[:-1]
             if not localPath:
                 raise ValueError("A local path is required. Use 'localPath' instead.")
             elif localPath[-1] == '/':
                 localPath = localPath[:-1]
         #check wich Version of SaveFile is wanted
-        if not version in list(trgList):
+        version = version.upper().strip() if version else ''
+        if version not in _TGTRLS:
             version = "*CURRENT"
-        else:
-            version = version.upper()
-        command_str:str = f'SAVLIB'
 
         #check if Library is valid or not
         validated_library =  self.__validate_max_value(value=library, param_name='library', str_format=['*NONSYS', '*ALLUSR', '*IBM', '*SELECT', '*USRSPC', library])
-        if validated_library:
-            command_str += f' LIB({validated_library})'
-        else:
+        if not validated_library:
             library_str = str(library)
             raise ValueError(f"The library '{library_str}' is not valid. Must be one of the specified strings or a valid number.")
         #check Dev - Device
-        if not dev in ['*SAVF', '*MEDDFN']:
-            command_str += f' DEV(*SAVF)'
-        else:
-            command_str += f' DEV({dev.upper()})'
+        dev = dev.upper() if dev else ''
+        if dev not in _SAVLIB_DEVICES:
+            dev = '*SAVF'
+        savlib_opts = ''
         if vol is not None and vol == '*MOUNTED':
-            command_str += f' VOL({vol})'
+            savlib_opts += f' VOL({vol})'
+        # the fields of the CL command templates, built once per call
+        fields = {'lib': validated_library, 'to': to_u, 'f': savf_u,
+                  'dev': dev, 'opts': savlib_opts, 'ver': version}
         #starting with mem main Sourcecode of saveLLibrary
-        if self.__crtsavf(saveFileName, toLibrary, description, max_records=max_records, asp=asp, waitFile=waitFile, share=share, authority=authority):
-            #command_str: str = f"SAVLIB LIB({library.strip()}) DEV(*SAVF) SAVF({toLibrary.strip()}/{saveFileName.strip()}) TGTRLS({version.strip()})"
-            command_str += f" SAVF({toLibrary.strip()}/{saveFileName.strip()}) TGTRLS({version.strip()})"
-            print(command_str)
+        crtsavf_str = self.__crtsavfCommand(savf_u, to_u, description, max_records=max_records, asp=asp, waitFile=waitFile, share=share, authority=authority)
+        command_str = _SAVLIB.format_map(fields)
+        print(command_str)
+        # the ODBC connection is shared with other threads, so every
+        # database step runs under self._db_lock
+        try:
+            if not getZip:
+                # CRTSAVF and SAVLIB in one call, a single round-trip
+                self.__runSave(crtsavf_str, command_str)
+            else:
+                destination_local_path = join(localPath, savf_u + '.savf')
+
+                if remPath:
+                    # IFS paths always use '/', also when running on Windows
+                    remote_temp_savf_path = ifs_join(remPath, savf_u + '.savf')
+                    fields['path'] = _cl_quote(remote_temp_savf_path.strip())
+                    cpy_command_str = _CPYTOSTMF.format_map(fields)
+                else:
+                    # the save file is readable through the QSYS.LIB file system,
+                    # so it is downloaded without writing an IFS copy first
+                    remote_temp_savf_path = _QSYS_SAVF_PATH.format_map(fields)
+
+                # SAVLIB runs in a worker thread, while this thread opens the
+                # SSH session for the download in the meantime
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    saving = executor.submit(self.__runSave, crtsavf_str, command_str)
+                    try:
+                        self._get_sftp(port if port else 2222, compress)
+                    except Exception:
+                        # the download opens the session again and reports the error
+                        pass
+                    saving.result()
+
+        except pyodbc.Error as e:
+            self.__handle_error(error=e, pgm="saveLibrary")
+            # do not leave a half-written (or an older) save file behind,
+            # the next call could not create it again
+            with self._db_lock:
+                self.__removeStaleSavf(to_u, savf_u)
+            return False
+        except Exception as e:
+            self.__handle_error(error=e, pgm="saveLibrary")
+            return False
+
+        # the library now holds one more object
+        self.invalidate_info_cache(to_u)
+        if not getZip:
+            print(f"Successfully saved in the Library '{library}' successfully.")
+            return True
+
+        if remPath:
+            # the copy is a step of its own: when it fails, the save file is
+            # kept, so the copy can be repeated without running SAVLIB again
             try:
-                with self.conn.cursor() as cursor:
-                    # execute the Command for creating a Savefile.
-                    cursor.execute("CALL QSYS2.QCMDEXC(?)", (command_str))
-                    if getZip:
-                        try:
-                            remote_temp_savf_path = join(remPath, saveFileName.upper() + '.savf')
-
-                            destination_local_path = join(localPath, saveFileName.upper() + '.savf')
-                            command_str = (
-                                f"CPYTOSTMF FROMMBR('/QSYS.LIB/{toLibrary.upper().strip()}.LIB/{saveFileName.upper().strip()}.FILE') "
-                                f"TOSTMF('{remote_temp_savf_path.strip()}') STMFOPT(*REPLACE)"
-                            )
-
-                            # Execute the command on the remote system
-                            cursor.execute("CALL QSYS2.QCMDEXC(?)", (command_str,))
-
-                            if  self.__getSavFile(localFilePath=destination_local_path,
-                                                     remotePath=remote_temp_savf_path, port=port):
-                                rmvCommand = f"QSH CMD('rm -r {remote_temp_savf_path}')"
-                                cursor.execute("CALL QSYS2.QCMDEXC(?)", (rmvCommand))
-                            else:
-                                raise ValueError("Something went wrong. With downloading the Save File.")
-                            if remSavf:
-                                if not self.removeFile(library=toLibrary, saveFileName=saveFileName):
-                                    raise ValueError(f"The Save File {saveFileName} was not successfully removed.")
-
-                        except Exception as e:
-                            self.__handle_error(error=e, pgm="saveLibrary - Transfer")
+                self._qcmdexec(cpy_command_str)
+            except pyodbc.Error as e:
+                self.__handle_error(error=e, pgm="saveLibrary - Copy")
+                print(f"The Save File {to_u}/{savf_u} is kept on the IBM i.")
+                return False
 
-            except Exception as e:
-                self.__handle_error(error=e, pgm="saveLibrary")
-                self.conn.rollback()
+        # a failed download leaves the save file on the IBM i, so only the
+        # download is repeated instead of the whole save
+        downloaded = False
+        local_digest = None
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # the IBM i computes its checksum while the file is downloaded
+            checksum = executor.submit(self.__remoteSha256, remote_temp_savf_path, port) if verify else None
+            for attempt in range(1, _DOWNLOAD_ATTEMPTS + 1):
+                # the local checksum is computed during the download
+                local_digest = hashlib.sha256() if verify else None
+                try:
+                    # the download runs outside the lock, so other threads
+                    # can use the database connection meanwhile
+                    if transfer == 'ssh':
+                        # the IFS copy is removed by the streaming command itself,
+                        # unless it is still needed for the checksum
+                        downloaded = self.__streamSavFile(localFilePath=destination_local_path,
+                                                          remotePath=remote_temp_savf_path, port=port,
+                                                          removeRemote=bool(remPath) and not verify,
+                                                          digest=local_digest, compress=compress)
+                    else:
+                        downloaded = self.__getSavFile(localFilePath=destination_local_path,
+                                                       remotePath=remote_temp_savf_path, port=port,
+                                                       prefetch=prefetch, chunk_size=chunk_size,
+                                                       digest=local_digest, compress=compress)
+                    break
+                except _TRANSIENT_ERRORS as e:
+                    print(f"Download attempt {attempt} of {_DOWNLOAD_ATTEMPTS} failed: {e}")
+                    # start the next attempt on a fresh connection
+                    with self._sftp_lock:
+                        self._close_sftp()
+                except Exception as e:
+                    # e.g. a full local disk or a missing permission, retrying does not help
+                    self.__handle_error(error=e, pgm="saveLibrary - Transfer")
+                    break
+            remote_digest = checksum.result() if checksum is not None else None
+        if not downloaded:
+            print(f"The Save File {to_u}/{savf_u} could not be downloaded, it is kept on the IBM i.")
+            return False
+        if verify:
+            if remote_digest is None:
+                print(f"The checksum of {remote_temp_savf_path} could not be computed on the IBM i.")
+                return False
+            if local_digest.hexdigest() != remote_digest:
+                print(f"The checksum of {destination_local_path} does not match the Save File on the IBM i.")
                 return False
+
+        try:
+            if remPath and (transfer != 'ssh' or verify):
+                rmvCommand = _RMSTMF.format_map(fields)
+                self._qcmdexec(rmvCommand)
+        except pyodbc.Error as e:
+            self.__handle_error(error=e, pgm="saveLibrary - Cleanup")
+            return False
+        if remSavf:
+            with self._db_lock:
+                removed = self.removeFile(library=to_u, saveFileName=savf_u)
+            if not removed:
+                print(f"The Save File {saveFileName} was not successfully removed.")
+                return False
+
+        print(f"File successfully downloaded to: {destination_local_path}")
+        return True
+
+    # ------------------------------------------------------
+    # _qcmdexec - run a CL command on the QCMDEXC cursor
+    # ------------------------------------------------------
+    def _qcmdexec(self, command: str):
+        """
+            Runs a CL command through QCMDEXC while holding the database lock.
+
+            The command runs on a cursor of its own that only ever executes
+            `CALL QSYS2.QCMDEXC(?)`. pyodbc keeps the statement prepared when
+            the same SQL is executed again on a cursor, so only the command
+            string is bound for every further call.
+
+            Args:
+                command (str): The CL command.
+        """
+        with self._db_lock:
+            if self._qcmdexec_cursor is None:
+                self._qcmdexec_cursor = self.conn.cursor()
+            self._qcmdexec_cursor.execute(self._qcmd_sql, (command,))
+
+    # ------------------------------------------------------
+    # __runSave - run the commands of one save in a single call
+    # ------------------------------------------------------
+    def __runSave(self, crtsavf: str, savlib: str):
+        """
+            Runs CRTSAVF and SAVLIB in a single call.
+
+            The first save on a connection creates the procedure QTEMP.ILIBSAVE,
+            which runs the commands through QCMDEXC. Later saves on the same
+            connection (QTEMP belongs to its job) just call it with the commands
+            as parameters, so DB2 for i neither has to compile a compound
+            statement for every save nor parse the command text inside it. If
+            the procedure cannot be created, a compound statement is used.
+
+            Args:
+                crtsavf (str): The CRTSAVF command.
+                savlib (str): The SAVLIB command.
+        """
+        with self._db_lock:
+            if self._procedure_installed is None:
+                try:
+                    self.cursor.execute(_ILIBSAVE_PROCEDURE)
+                    self._procedure_installed = True
+                except pyodbc.Error:
+                    # expected without the authority to create procedures,
+                    # the compound statement below works just as well
+                    self._procedure_installed = False
+            if self._procedure_installed:
+                self.cursor.execute(_ILIBSAVE_CALL, (crtsavf, savlib))
             else:
-                self.conn.commit()
-                if getZip:
-                    print(f"File successfully downloaded to: {destination_local_path}")
-                    return True
+                self.cursor.execute(_qcmdexc_block(crtsavf, savlib))
+
+    # ------------------------------------------------------
+    # saveLibraries - save several libraries and download
+    #                 the Savefiles in parallel
+    # ------------------------------------------------------
+    def saveLibraries(self, specs: list[dict], max_workers: int = 8) -> list[bool]:
+        """
+            Saves several libraries in parallel.
 
-                print(f"Successfully saved in the Library '{library}' successfully.")
-                return True
+            Every entry of `specs` holds the keyword arguments of one `saveLibrary`
+            call. Each worker thread opens its own database connection (and SSH
+            connection for the downloads), so the SAVLIB commands of different
+            libraries run at the same time on the IBM i. The connections are
+            closed again when all libraries are done.
 
-        return False
+            Args:
+                specs (list[dict]): The keyword arguments for each `saveLibrary` call.
+                max_workers (int, optional): The number of libraries processed at the same
+                                             time, and so the number of extra database
+                                             connections. Defaults to 8.
+
+            Returns:
+                list[bool]: The result of `saveLibrary` for each entry, in the order of `specs`.
+        """
+        if not specs:
+            return []
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+
+        local = threading.local()
+        workers = []
+        workers_lock = threading.Lock()
+
+        def save(spec: dict) -> bool:
+            # one failing library must not end the batch
+            try:
+                worker = getattr(local, 'worker', None)
+                if worker is None:
+                    worker = type(self)(self.db_user, self.db_password, self.db_host, self.db_driver)
+                    worker._pooled = self._pooled
+                    with workers_lock:
+                        workers.append(worker)
+                    worker.__enter__()
+                    local.worker = worker
+                return worker.saveLibrary(**spec)
+            except Exception as e:
+                self.__handle_error(error=e, pgm="saveLibraries")
+                return False
+
+        try:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(specs))) as executor:
+                return list(executor.map(save, specs))
+        finally:
+            for worker in workers:
+                worker.close()
+            # the workers only cleared their own caches
+            for spec in specs:
+                to_library = spec.get('toLibrary') or spec.get('library')
+                if to_library:
+                    self.invalidate_info_cache(to_library.strip())
 
     # ------------------------------------------------------
     # sub Function: create the Savefile on the AS400
     # ------------------------------------------------------
-    def __crtsavf(self,
-                  saveFileName:str,
-                  library:str,
-                  description:str=None,
-                  max_records: Union[int, str, None] = None,
-                  asp: Union[int, str, None] = None,
-                  waitFile: Union[int, str, None] = None,
-                  share:str=None,
-                  authority:str=None
-                ) -> bool:
+    def __crtsavfCommand(self,
+                         saveFileName:str,
+                         library:str,
+                         description:str=None,
+                         max_records: Union[int, str, None] = None,
+                         asp: Union[int, str, None] = None,
+                         waitFile: Union[int, str, None] = None,
+                         share:str=None,
+                         authority:str=None
+                        ) -> str:
         """
-            Sub-function to create a save file on the IBM i server.
+            Sub-function to build the command that creates a save file on the IBM i server.
 
-            This function executes the `CRTSAVF` (Create Save File) CL command
-            to create a new save file in the specified library. This is a
-            prerequisite for saving a library's contents.
+            The `CRTSAVF` (Create Save File) CL command creates a new save file in
+            the specified library. This is a prerequisite for saving a library's
+            contents, so saveLibrary() runs it in the same statement as `SAVLIB`.
 
             Args:
                 saveFileName (str): The name of the save file to be created.
@@ -186,7 +503,7 @@ class saveLibrary:
                 description (str, optional): A text description for the save file. Defaults to None.
 
             Returns:
-                bool: True if the save file was created successfully, False otherwise.
+                str: The CRTSAVF command.
         """
         # check is a parameter empty or not
 
@@ -196,8 +513,9 @@ class saveLibrary:
             raise ValueError("A library name is required.")
         if not description:
             description = 'A SaveFile from iLibrary'
-
-        command_str: str = f"CRTSAVF FILE({library.upper().strip()}/{saveFileName.upper().strip()}) TEXT('{description.strip()}')"
+        # saveLibrary() passes the names already uppercased
+        command_str: str = _CRTSAVF.format_map({'lib': library, 'f': saveFileName,
+                                                'desc': _cl_quote(description.strip())})
 
         #check max_records for MAXRCDS parameter
         if self.__validate_max_value(value=max_records, param_name='max_records', str_format=['*NOMAX'], max_limit=4293525600) and not None:
@@ -225,32 +543,35 @@ class saveLibrary:
                 command_str += f" AUT({upper_authority})"
 
         print (command_str)
-        try:
-            with self.conn.cursor() as cursor:
-                #execute the Command for creating a Savefile.
-                cursor.execute("CALL QSYS2.QCMDEXC(?)", (command_str))
+        return command_str
+
+    # ------------------------------------------------------
+    # __removeStaleSavf - remove a save file left by a failed save
+    # ------------------------------------------------------
+    def __removeStaleSavf(self, library: str, saveFileName: str):
+        """
+            Removes the save file, if it exists, after a failed save.
 
+            Args:
+                library (str): The (uppercase) library of the save file.
+                saveFileName (str): The (uppercase) name of the save file.
+        """
+        sql = """
+              SELECT 1
+              FROM QSYS2.SAVE_FILE_INFO
+              WHERE SAVE_FILE_LIBRARY = ? \
+                AND SAVE_FILE = ?
+                  FETCH FIRST 1 ROW ONLY \
+              """
+        try:
+            cursor = self.cursor
+            cursor.execute(sql, library, saveFileName)
+            result = cursor.fetchone()
         except Exception as e:
-            self.__handle_error(error=e, pgm="__crtsavf")
-            #remove a SAVF if its exists and we got an error
-            if e.args[0] == 'HY000':
-                sql = """
-                      SELECT 1
-                      FROM QSYS2.SAVE_FILE_INFO
-                      WHERE SAVE_FILE_LIBRARY = ? \
-                        AND SAVE_FILE = ?
-                          FETCH FIRST 1 ROW ONLY \
-                      """
-                cursor = self.conn.cursor()
-                cursor.execute(sql, library, saveFileName)
-                result = cursor.fetchone()
-                if result is not None:
-                    self.removeFile(library=library, saveFileName=saveFileName)
-            self.conn.rollback()
-            return False
-        else:
-            self.conn.commit()
-            return True
+            self.__handle_error(error=e, pgm="__removeStaleSavf")
+            return
+        if result is not None:
+            self.removeFile(library=library, saveFileName=saveFileName)
 
     # --------------------------------------------------------------------------
     # __validate_max_value - Helper Function for checking parameter
@@ -280,7 +601,7 @@ class saveLibrary:
             for special_value in str_format:
                 normalized_special_value = special_value.upper()
 
-                if upper_value == special_value.upper() or upper_value == normalized_special_value:
+                if upper_value == normalized_special_value:
                     # Found a match! Return the official, fully formatted string.
                     return special_value
 
@@ -313,7 +634,11 @@ class saveLibrary:
     def __getSavFile(self,
                      localFilePath: str,
                      remotePath: str,
-                     port:int=None
+                     port:int=None,
+                     prefetch: bool = True,
+                     chunk_size: int = _SFTP_WINDOW,
+                     digest=None,
+                     compress: bool = False
                     ) -> bool:
         """
             Downloads a file from the remote IBM i via SFTP.
@@ -327,12 +652,28 @@ class saveLibrary:
                 remotePath (str): The full path on the local machine where the file
                                        will be saved. For example, '/Users/user/Documents/somefile.savf'.
                 port (int, optional): The port to connect to the IBMi server. Defaults to None.
+                prefetch (bool, optional): If True, each part is prefetched as a whole. If False,
+                                           only `chunk_size` bytes are requested ahead, so fewer
+                                           requests are queued on very long transfers.
+                                           Defaults to True.
+                chunk_size (int, optional): The number of bytes requested ahead with `prefetch=False`.
+                                            Defaults to 32 MiB.
+                digest (hashlib hash, optional): Updated with the file's data. The parts are hashed
+                                                 from the memory mapped file in order as soon as each
+                                                 one is complete, so hashing overlaps with the download
+                                                 of the later parts; only the last part is hashed after
+                                                 the transfer. This is one more pass over the data in
+                                                 memory, not a second read from disk. Defaults to None.
+                compress (bool, optional): If True, the SSH connection is compressed. Defaults to False.
 
             Returns:
                 bool: True if the file was downloaded successfully, False otherwise.
 
             Raises:
                 ValueError: If either the remote_file_path or local_save_path is not provided.
+                paramiko.ssh_exception.SSHException, EOFError: If the connection breaks during
+                                                              the download, so the caller can retry.
+                _ShortReadError: If the remote file ends before its reported size.
         """
         if not localFilePath:
             print("Error: A local file path is required.")
@@ -342,34 +683,328 @@ class saveLibrary:
             return False
         if not port:
             port = 2222
-        ssh_client = paramiko.SSHClient()
-
-        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
 
         try:
-            with ssh_client:
-                ssh_client.connect(
-                    hostname=self.db_host,
-                    username=self.db_user,
-                    password=self.db_password,
-                    port=port
-                )
-                with ssh_client.open_sftp() as ftp_client:
-                    ftp_client.get(remotePath, localFilePath)
+            ftp_client = self._get_sftp(port, compress)
+            file_size = ftp_client.stat(remotePath).st_size
+            # pre-allocate the local file and map it into memory, so the parallel
+            # parts share one mapping instead of a file handle with seek/write
+            # each; paramiko still returns a new bytes object for every read,
+            # which is copied into the mapping once
+            with open(localFilePath, 'w+b') as local_file:
+                local_file.truncate(file_size)
+                if not file_size:
                     return True
+                with mmap.mmap(local_file.fileno(), file_size) as mapped:
+                    target = memoryview(mapped)
+                    try:
+                        # split the file into byte ranges that are downloaded in parallel
+                        part_size = max(-(-file_size // _SFTP_WORKERS), _SFTP_MIN_PART_SIZE)
+                        parts = [(start, min(start + part_size, file_size)) for start in range(0, file_size, part_size)]
+                        if len(parts) == 1:
+                            self.__getSavFilePart(ftp_client, remotePath, target, *parts[0], prefetch, chunk_size)
+                            if digest is not None:
+                                digest.update(target)
+                        else:
+                            transport = ftp_client.get_channel().get_transport()
+
+                            def download_part(start: int, end: int):
+                                # paramiko does not lock an SFTP channel against concurrent
+                                # readers, so every part gets a channel of its own on the
+                                # shared transport
+                                with paramiko.SFTPClient.from_transport(transport) as part_client:
+                                    part_client.get_channel().settimeout(_SFTP_TIMEOUT)
+                                    self.__getSavFilePart(part_client, remotePath, target,
+                                                          start, end, prefetch, chunk_size)
+
+                            with ThreadPoolExecutor(max_workers=len(parts)) as executor:
+                                futures = [executor.submit(download_part, start, end) for start, end in parts]
+                                for (start, end), future in zip(parts, futures):
+                                    future.result()
+                                    if digest is not None:
+                                        digest.update(target[start:end])
+                    finally:
+                        target.release()
+            return True
 
         except paramiko.ssh_exception.AuthenticationException as e:
             print(f"Authentication failed. Check your username and password: {e}")
             return False
-        except paramiko.ssh_exception.SSHException as e:
-            print(f"SSH error occurred: {e}")
-            return False
         except FileNotFoundError as e:
             print(f"File not found on the remote host: {e}")
             return False
 
-        finally:
-            pass
+    # ------------------------------------------------------
+    # __getSavFilePart - download one byte range of a file
+    # ------------------------------------------------------
+    def __getSavFilePart(self,
+                         ftp_client: paramiko.SFTPClient,
+                         remotePath: str,
+                         target: memoryview,
+                         start: int,
+                         end: int,
+                         prefetch: bool = True,
+                         chunk_size: int = _SFTP_WINDOW
+                        ):
+        """
+            Downloads the bytes from `start` up to `end` of the remote file into the
+            same range of `target`, the memory mapped local file. Parts that run in
+            parallel threads need an `ftp_client` (SFTP channel) each.
+
+            Args:
+                ftp_client (paramiko.SFTPClient): The connected SFTP client, used by this part only.
+                remotePath (str): The full path to the file on the remote IBM i's IFS.
+                target (memoryview): The memory mapped local file.
+                start (int): The first byte of the range.
+                end (int): The byte after the last byte of the range.
+                prefetch (bool, optional): If True, the whole range is prefetched, otherwise only
+                                           `chunk_size` bytes are requested ahead. Defaults to True.
+                chunk_size (int, optional): The number of bytes requested ahead with `prefetch=False`.
+                                            Defaults to 32 MiB.
+
+            Raises:
+                _ShortReadError: If the remote file ends before `end`.
+        """
+        with ftp_client.open(remotePath, 'rb', bufsize=_SFTP_BUFSIZE) as remote_file:
+            # prefetch the range in 32 KiB requests, so the reads are in flight
+            # while we copy instead of waiting for an answer on every block;
+            # without prefetch only the requests for one window are in flight,
+            # which keeps multi-hour transfers from piling up pending requests
+            remote_file.MAX_REQUEST_SIZE = _SFTP_REQUEST_SIZE
+            remote_file.set_pipelined(True)
+            remote_file.seek(start)
+            max_requests = None if prefetch else max(1, chunk_size // _SFTP_REQUEST_SIZE)
+            remote_file.prefetch(end, max_requests)
+            position = start
+            while position < end:
+                data = remote_file.read(min(_SFTP_CHUNK_SIZE, end - position))
+                if not data:
+                    raise _ShortReadError(f"Unexpected end of {remotePath} at byte {position} of {end}.")
+                target[position:position + len(data)] = data
+                position += len(data)
+
+    # ------------------------------------------------------
+    # __streamSavFile - stream a file over an SSH channel
+    # ------------------------------------------------------
+    def __streamSavFile(self,
+                        localFilePath: str,
+                        remotePath: str,
+                        port: int = None,
+                        removeRemote: bool = True,
+                        digest=None,
+                        compress: bool = False
+                       ) -> bool:
+        """
+            Downloads a file by running `cat` on the IBM i and writing its output
+            to the local file, then removes the remote file in the same command
+            unless `removeRemote` is False.
+
+            A single exec channel carries the file as one stream, without the
+            request/response framing of SFTP, and saves the extra round-trip for
+            removing the IFS copy.
+
+            Args:
+                localFilePath (str): The full path of the local file.
+                remotePath (str): The full path to the file on the remote IBM i's IFS.
+                port (int, optional): The port to connect to the IBMi server. Defaults to None.
+                removeRemote (bool, optional): If True, the remote file is removed after it was
+                                               read. Defaults to True.
+                digest (hashlib hash, optional): Updated with the data while it is written. Defaults to None.
+                compress (bool, optional): If True, the SSH connection is compressed. Defaults to False.
+
+            Returns:
+                bool: True if the file was downloaded (and removed) successfully, False otherwise.
+
+            Raises:
+                paramiko.ssh_exception.SSHException: If the connection breaks during the
+                                                     download, so the caller can retry.
+        """
+        if not port:
+            port = 2222
+        quoted_path = shlex.quote(remotePath)
+        try:
+            transport = self._get_sftp(port, compress).get_channel().get_transport()
+            with transport.open_session() as channel:
+                channel.settimeout(_SFTP_TIMEOUT)
+                command = f"cat {quoted_path}"
+                if removeRemote:
+                    command += f" && rm -f {quoted_path}"
+                channel.exec_command(command)
+                with channel.makefile('rb', _SFTP_CHUNK_SIZE) as remote_stream, open(localFilePath, 'wb') as local_file:
+                    for block in iter(lambda: remote_stream.read(_SFTP_CHUNK_SIZE), b''):
+                        local_file.write(block)
+                        if digest is not None:
+                            digest.update(block)
+                exit_status = channel.recv_exit_status()
+                if exit_status != 0:
+                    error_message = channel.makefile_stderr('rb').read().decode(errors='replace').strip()
+                    print(f"Streaming {remotePath} failed with exit status {exit_status}: {error_message}")
+                    return False
+            return True
+
+        except paramiko.ssh_exception.AuthenticationException as e:
+            print(f"Authentication failed. Check your username and password: {e}")
+            return False
+
+    # ------------------------------------------------------
+    # __remoteSha256 - checksum of a file on the IBM i
+    # ------------------------------------------------------
+    def __remoteSha256(self, remotePath: str, port: int = None) -> Union[str, None]:
+        """
+            Computes the SHA-256 checksum of a file on the IBM i over an SSH channel.
+
+            The checksum runs on an SSH connection of its own, so it is not cut
+            off when a failed download attempt closes the shared session.
+
+            Args:
+                remotePath (str): The full path to the file on the remote IBM i.
+                port (int, optional): The port to connect to the IBMi server. Defaults to None.
+
+            Returns:
+                str: The checksum as lowercase hex digits, or None if it could not be computed.
+        """
+        if not port:
+            port = 2222
+        quoted_path = shlex.quote(remotePath)
+        try:
+            transport = self.__openTransport(port)
+            try:
+                with transport.open_session() as channel:
+                    # hashing a large save file takes a while before the answer comes
+                    channel.settimeout(None)
+                    # sha256sum comes with the coreutils package, openssl is part of PASE
+                    channel.exec_command(f"sha256sum {quoted_path} 2>/dev/null || openssl dgst -sha256 -r {quoted_path}")
+                    with channel.makefile('rb') as output:
+                        result = output.read().decode(errors='replace')
+                    if channel.recv_exit_status() != 0 or not result.split():
+                        return None
+                    return result.split()[0].lower()
+            finally:
+                transport.close()
+
+        except (paramiko.ssh_exception.SSHException, OSError) as e:
+            print(f"SSH error occurred while computing the checksum: {e}")
+            return None
+
+    # ------------------------------------------------------
+    # _get_sftp - open or reuse the SFTP session
+    # ------------------------------------------------------
+    def _get_sftp(self, port: int, compress: bool = False) -> paramiko.SFTPClient:
+        """
+            Returns the SFTP session of this object, and opens it on first use.
+
+            The session stays open for further downloads and is closed
+            together with the database connection in close(). A session whose
+            transport has dropped, or that was opened on another port or with
+            another compression setting, is replaced by a new one.
+
+            Args:
+                port (int): The port to connect to the IBMi server.
+                compress (bool, optional): If True, the SSH connection is compressed. Defaults to False.
+
+            Returns:
+                paramiko.SFTPClient: The connected SFTP client.
+        """
+        with self._sftp_lock:
+            if self._sftp is not None and (self._sftp_port != port or self._sftp_compress != compress
+                                           or not self._sftp.get_channel().get_transport().is_active()):
+                self._close_sftp()
+            if self._sftp is None:
+                self._sftp = self.__openSftp(port, compress)
+                self._sftp_port = port
+                self._sftp_compress = compress
+            return self._sftp
+
+    # ------------------------------------------------------
+    # __openSftp - open a tuned SFTP session
+    # ------------------------------------------------------
+    def __openSftp(self, port: int, compress: bool = False) -> paramiko.SFTPClient:
+        """
+            Opens a new SFTP session on a new tuned SSH connection.
+
+            Args:
+                port (int): The port to connect to the IBMi server.
+                compress (bool, optional): If True, the SSH connection is compressed. Defaults to False.
+
+            Returns:
+                paramiko.SFTPClient: The connected SFTP client.
+        """
+        transport = self.__openTransport(port, compress)
+        try:
+            ftp_client = paramiko.SFTPClient.from_transport(transport)
+            # generous timeout, so the prefetch pipeline is never cut short
+            # while a stalled connection still fails instead of hanging
+            ftp_client.get_channel().settimeout(_SFTP_TIMEOUT)
+            return ftp_client
+        except Exception:
+            transport.close()
+            raise
+
+    # ------------------------------------------------------
+    # __openTransport - open a tuned SSH connection
+    # ------------------------------------------------------
+    def __openTransport(self, port: int, compress: bool = False) -> paramiko.Transport:
+        """
+            Opens a new SSH connection with tuned socket and SSH window sizes.
+
+            Args:
+                port (int): The port to connect to the IBMi server.
+                compress (bool, optional): If True, zlib compression is negotiated. It only pays
+                                           off when the link is slower than the compression;
+                                           save files compressed on the IBM i do not shrink.
+                                           Defaults to False.
+
+            Returns:
+                paramiko.Transport: The connected and authenticated transport.
+        """
+        sock = None
+        transport = None
+        try:
+            # build the TCP socket by hand, so the buffers are sized before the
+            # handshake (TCP window scaling is negotiated on connect)
+            family, socktype, proto, _, address = socket.getaddrinfo(self.db_host, port, type=socket.SOCK_STREAM)[0]
+            sock = socket.socket(family, socktype, proto)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            for option in (socket.SO_SNDBUF, socket.SO_RCVBUF):
+                try:
+                    sock.setsockopt(socket.SOL_SOCKET, option, _SOCK_BUFSIZE)
+                except OSError:
+                    # the system refuses the size, keep its default buffer
+                    pass
+            sock.connect(address)
+
+            transport = paramiko.Transport(sock)
+            transport.default_window_size = _SSH_WINDOW_SIZE
+            transport.default_max_packet_size = _SSH_MAX_PACKET_SIZE
+            # compression has to be requested before the handshake
+            transport.use_compression(compress)
+            transport.connect(username=self.db_user, password=self.db_password)
+            # keep the cached connection from being dropped by idle timeouts
+            transport.set_keepalive(_SSH_KEEPALIVE)
+            return transport
+        except Exception:
+            if transport is not None:
+                transport.close()
+            elif sock is not None:
+                sock.close()
+            raise
+
+    # ------------------------------------------------------
+    # _close_sftp - close the cached SFTP session
+    # ------------------------------------------------------
+    def _close_sftp(self):
+        """
+        Closes the SFTP session and its SSH transport, if one is open.
+        """
+        if self._sftp is not None:
+            transport = self._sftp.get_channel().get_transport()
+            try:
+                self._sftp.close()
+            finally:
+                transport.close()
+                self._sftp = None
+                self._sftp_port = None
+                self._sftp_compress = None
 
     def removeFile(self, library:str, saveFileName:str) -> bool:
         """
@@ -379,18 +1014,18 @@ class saveLibrary:
         :return:
         Boolean: True if the file was removed successfully, False otherwise.
         """
-        command_str: str = f"DLTF FILE({library.upper()}/{saveFileName.upper()})"
+        lib_u = library.upper()
+        savf_u = saveFileName.upper()
+        command_str: str = _DLTF.format_map({'lib': lib_u, 'f': savf_u})
         try:
-            with self.conn.cursor() as cursor:
-                # execute the Command for deleting a Savefile.
-                cursor.execute("CALL QSYS2.QCMDEXC(?)", (command_str))
+            # execute the Command for deleting a Savefile.
+            self._qcmdexec(command_str)
 
         except Exception as e:
             self.__handle_error(error=e, pgm="removeFile")
-            self.conn.rollback()
             return False
         else:
-            self.conn.commit()
+            self.invalidate_info_cache(lib_u)
             return True
 
 
@@ -403,8 +1038,11 @@ class saveLibrary:
         """
         print("-------------------------------------------------------------")
         print(f"An error occurred while executing command in function {pgm}:")
-        sqlstate = error.args[0]
-        error_message = error.args[1]
+        if isinstance(error, pyodbc.Error) and len(error.args) > 1:
+            sqlstate = error.args[0]
+            error_message = error.args[1]
 
-        print(f"SQLSTATE: {sqlstate}")
-        print(f"Message: {error_message}")
\ No newline at end of file
+            print(f"SQLSTATE: {sqlstate}")
+            print(f"Message: {error_message}")
+        else:
+            print(f"Message: {error}")
\ No newline at end of file
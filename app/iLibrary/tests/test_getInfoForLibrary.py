@@ -0,0 +1,135 @@
+import io
+from unittest.mock import MagicMock
+
+import orjson
+import pytest
+
+from iLibrary import Library
+from iLibrary.src import getInfoForLibrary as info_module
+
+
+@pytest.fixture
+def connected_lib():
+    """
+    A Library whose cursor is a mock, without an IBM i behind it.
+    """
+    library = Library('USER', 'PASSWORD', '127.0.0.1', 'DRIVER')
+    library.conn = MagicMock()
+    library.cursor = MagicMock()
+    yield library
+    library.conn = None
+    library.cursor = None
+    library.close()
+
+
+# ---------------------------------------------
+# SELECT list
+# ---------------------------------------------
+def test_select_list():
+    assert info_module._select_list(('OBJNAME', 'OBJCREATED', 'LAST_USED_TIMESTAMP', 'OBJSIZE')) == (
+        "OBJNAME, "
+        "VARCHAR_FORMAT(OBJCREATED, 'YYYY-MM-DD HH24:MI:SS') AS OBJCREATED, "
+        "VARCHAR_FORMAT(LAST_USED_TIMESTAMP, 'YYYY-MM-DD HH24:MI:SS') AS LAST_USED_TIMESTAMP, "
+        "CAST(OBJSIZE AS VARCHAR(32)) AS OBJSIZE"
+    )
+
+
+# ---------------------------------------------
+# getLibraryInfo cache
+# ---------------------------------------------
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Replaces the clock of the cache with one that only moves when told to.
+    """
+    now = [1000.0]
+    monkeypatch.setattr(info_module.time, 'monotonic', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def info_row(connected_lib):
+    connected_lib.cursor.fetchall.return_value = [tuple(range(len(info_module._LIBRARY_INFO_COLS)))]
+
+
+def test_library_info_cached_until_ttl(connected_lib, info_row, clock):
+    first = connected_lib.getLibraryInfo('mylib')
+    clock[0] += info_module._INFO_CACHE_TTL - 1
+    assert connected_lib.getLibraryInfo('MYLIB') == first
+    assert connected_lib.cursor.execute.call_count == 1
+
+    clock[0] += 2
+    assert connected_lib.getLibraryInfo('MYLIB') == first
+    assert connected_lib.cursor.execute.call_count == 2
+
+
+def test_library_info_cache_invalidation(connected_lib, info_row, clock):
+    connected_lib.getLibraryInfo('LIBA')
+    connected_lib.getLibraryInfo('LIBB')
+
+    connected_lib.invalidate_info_cache('liba')
+    connected_lib.getLibraryInfo('LIBA')
+    connected_lib.getLibraryInfo('LIBB')
+    assert connected_lib.cursor.execute.call_count == 3
+
+    connected_lib.invalidate_info_cache()
+    assert connected_lib._info_cache == {}
+
+
+def test_library_info_cache_drops_oldest(connected_lib, info_row, clock, monkeypatch):
+    monkeypatch.setattr(info_module, '_INFO_CACHE_SIZE', 2)
+
+    for library in ('LIBA', 'LIBB', 'LIBC'):
+        connected_lib.getLibraryInfo(library)
+
+    assert list(connected_lib._info_cache) == [('LIBB', True), ('LIBC', True)]
+
+
+def test_library_info_errors_are_not_cached(connected_lib, clock):
+    connected_lib.cursor.execute.side_effect = RuntimeError('connection lost')
+
+    assert connected_lib.getLibraryInfo('MYLIB') is None
+    assert connected_lib._info_cache == {}
+
+
+# ---------------------------------------------
+# getFileInfo
+# ---------------------------------------------
+@pytest.mark.parametrize('qFiles', [False, True])
+def test_get_file_info_binds_upper_library(connected_lib, qFiles):
+    connected_lib.cursor.description = [('OBJNAME',)]
+    connected_lib.cursor.fetchmany.side_effect = [[('A',)], []]
+
+    connected_lib.getFileInfo('mylib', qFiles=qFiles)
+
+    assert connected_lib.cursor.execute.call_args[0][1] == 'MYLIB'
+
+
+@pytest.mark.parametrize('batches', [
+    [[('A', 1)]],
+    [[('A', 1), ('B', 2)], [('C', 3)], [('D', 4), ('E', 5)]],
+], ids=['one batch', 'many batches'])
+def test_get_file_info_streams_batches(connected_lib, batches):
+    connected_lib.cursor.description = [('OBJNAME',), ('OBJSIZE',)]
+    connected_lib.cursor.fetchmany.side_effect = batches + [[]]
+    out = io.BytesIO()
+
+    assert connected_lib.getFileInfo('MYLIB', out=out) is True
+    rows = [row for batch in batches for row in batch]
+    assert orjson.loads(out.getvalue()) == [{'OBJNAME': name, 'OBJSIZE': size} for name, size in rows]
+
+
+def test_get_file_info_no_batches(connected_lib):
+    connected_lib.cursor.description = [('OBJNAME',)]
+    connected_lib.cursor.fetchmany.side_effect = [[]]
+    out = io.BytesIO()
+
+    assert connected_lib.getFileInfo('MYLIB', out=out) == 'No Files Found in Library: MYLIB'
+    assert out.getvalue() == b''
+
+
+def test_get_file_info_returns_string_without_out(connected_lib):
+    connected_lib.cursor.description = [('OBJNAME',)]
+    connected_lib.cursor.fetchmany.side_effect = [[('A',)], [('B',)], []]
+
+    assert orjson.loads(connected_lib.getFileInfo('MYLIB')) == [{'OBJNAME': 'A'}, {'OBJNAME': 'B'}]
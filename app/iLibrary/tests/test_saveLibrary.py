@@ -0,0 +1,433 @@
+import hashlib
+import os
+import socket
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import paramiko
+import pyodbc
+import pytest
+
+from iLibrary import Library
+from iLibrary.src import saveLibrary as save_module
+
+
+# ---------------------------------------------
+# Stub SSH/SFTP server serving local files
+# ---------------------------------------------
+class StubServer(paramiko.ServerInterface):
+    """
+    Accepts every password login and opens session channels.
+    """
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_exec_request(self, channel, command):
+        def run():
+            result = subprocess.run(command.decode(), shell=True, capture_output=True)
+            channel.sendall(result.stdout)
+            channel.sendall_stderr(result.stderr)
+            channel.send_exit_status(result.returncode)
+            channel.close()
+
+        threading.Thread(target=run, daemon=True).start()
+        return True
+
+
+class StubSFTPHandle(paramiko.SFTPHandle):
+    def stat(self):
+        return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+
+class StubSFTPServer(paramiko.SFTPServerInterface):
+    """
+    Serves the local file system read-only.
+    """
+    def open(self, path, flags, attr):
+        try:
+            readfile = open(path, 'rb')
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        handle = StubSFTPHandle(flags)
+        handle.filename = path
+        handle.readfile = readfile
+        return handle
+
+    def stat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(path))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+
+@pytest.fixture(scope='module')
+def sftp_port():
+    """
+    Runs the stub server on a free local port for the tests of this module.
+    """
+    host_key = paramiko.RSAKey.generate(2048)
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(8)
+    transports = []
+
+    def serve():
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            transport = paramiko.Transport(conn)
+            transport.add_server_key(host_key)
+            # accept compression, the client decides whether to use it
+            transport.use_compression(True)
+            transport.set_subsystem_handler('sftp', paramiko.SFTPServer, StubSFTPServer)
+            transport.start_server(server=StubServer())
+            transports.append(transport)
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield listener.getsockname()[1]
+    listener.close()
+    for transport in transports:
+        transport.close()
+
+
+@pytest.fixture
+def lib():
+    library = Library('USER', 'PASSWORD', '127.0.0.1', 'DRIVER')
+    yield library
+    library.close()
+
+
+# ---------------------------------------------
+# CL commands
+# ---------------------------------------------
+def test_cl_quote():
+    assert save_module._cl_quote("Tom's library") == "Tom''s library"
+    assert save_module._cl_quote("plain") == "plain"
+
+
+def test_qcmdexc_block():
+    assert save_module._qcmdexc_block("CRTSAVF FILE(A/B)", "SAVLIB LIB(A) TEXT('It''s')") == (
+        "BEGIN CALL QSYS2.QCMDEXC('CRTSAVF FILE(A/B)'); "
+        "CALL QSYS2.QCMDEXC('SAVLIB LIB(A) TEXT(''It''''s'')'); END"
+    )
+
+
+# ---------------------------------------------
+# Save file download
+# ---------------------------------------------
+@pytest.mark.parametrize('size, min_part_size, expected_parts', [
+    (100, 1 << 20, 1),
+    ((5 << 20) + 1, 1 << 20, 6),
+    (80 << 10, 1 << 10, 8),
+])
+def test_get_savf_part_splitting(sftp_port, lib, tmp_path, monkeypatch, size, min_part_size, expected_parts):
+    """
+    The parts cover the file without gaps or overlap, are at least
+    _SFTP_MIN_PART_SIZE large and never more than _SFTP_WORKERS.
+    """
+    monkeypatch.setattr(save_module, '_SFTP_MIN_PART_SIZE', min_part_size)
+    payload = os.urandom(size)
+    remote = tmp_path / 'remote.savf'
+    remote.write_bytes(payload)
+    local = tmp_path / 'local.savf'
+    get_part = lib._saveLibrary__getSavFilePart
+    ranges = []
+
+    def record_part(ftp_client, remotePath, target, start, end, *args):
+        ranges.append((start, end))
+        get_part(ftp_client, remotePath, target, start, end, *args)
+
+    monkeypatch.setattr(lib, '_saveLibrary__getSavFilePart', record_part)
+
+    assert lib._saveLibrary__getSavFile(localFilePath=str(local), remotePath=str(remote), port=sftp_port)
+    assert local.read_bytes() == payload
+    ranges.sort()
+    assert len(ranges) == expected_parts
+    assert ranges[0][0] == 0 and ranges[-1][1] == size
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    assert all(end - start >= min_part_size for start, end in ranges[:-1])
+
+
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_get_savf_multi_part(sftp_port, lib, tmp_path, monkeypatch, prefetch):
+    """
+    A file split into several parts is downloaded completely and unchanged,
+    with the parts running in parallel.
+    """
+    monkeypatch.setattr(save_module, '_SFTP_MIN_PART_SIZE', 1 << 20)
+    monkeypatch.setattr(save_module, '_SFTP_TIMEOUT', 30)
+    payload = os.urandom((5 << 20) + 12345)
+    remote = tmp_path / 'remote.savf'
+    remote.write_bytes(payload)
+    local = tmp_path / 'local.savf'
+
+    assert lib._saveLibrary__getSavFile(localFilePath=str(local), remotePath=str(remote),
+                                        port=sftp_port, prefetch=prefetch, chunk_size=1 << 20)
+    assert local.read_bytes() == payload
+
+
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_get_savf_large_parts_defaults(sftp_port, lib, tmp_path, monkeypatch, prefetch):
+    """
+    With the default chunk_size, parts of 32 MiB and more are still read in
+    blocks of _SFTP_CHUNK_SIZE; only the prefetch window follows chunk_size.
+    """
+    monkeypatch.setattr(save_module, '_SFTP_MIN_PART_SIZE', 32 << 20)
+    payload = os.urandom((40 << 20) + 1)
+    remote = tmp_path / 'remote.savf'
+    remote.write_bytes(payload)
+    local = tmp_path / 'local.savf'
+    read = paramiko.SFTPFile.read
+    read_sizes = []
+
+    def record_read(self, size=None):
+        read_sizes.append(size)
+        return read(self, size)
+
+    monkeypatch.setattr(paramiko.SFTPFile, 'read', record_read)
+
+    assert lib._saveLibrary__getSavFile(localFilePath=str(local), remotePath=str(remote),
+                                        port=sftp_port, prefetch=prefetch)
+    assert local.read_bytes() == payload
+    assert max(read_sizes) == save_module._SFTP_CHUNK_SIZE
+
+
+@pytest.mark.parametrize('chunk_size', [0, -1])
+def test_save_library_rejects_chunk_size(lib, tmp_path, chunk_size):
+    with pytest.raises(ValueError):
+        lib.saveLibrary(library='MYLIB', saveFileName='MYSAVF', getZip=True,
+                        localPath=str(tmp_path), chunk_size=chunk_size)
+
+
+def test_get_sftp_compression(sftp_port, lib):
+    """
+    Compression is off unless asked for, and the cached session is replaced
+    when the setting changes.
+    """
+    plain = lib._get_sftp(sftp_port)
+    assert plain.get_channel().get_transport().local_compression == 'none'
+    assert lib._get_sftp(sftp_port) is plain
+
+    compressed = lib._get_sftp(sftp_port, compress=True)
+    assert compressed is not plain
+    assert compressed.get_channel().get_transport().local_compression.startswith('zlib')
+
+
+def test_get_savf_digest(sftp_port, lib, tmp_path, monkeypatch):
+    """
+    The digest passed to the download covers the parts in file order.
+    """
+    monkeypatch.setattr(save_module, '_SFTP_MIN_PART_SIZE', 1 << 20)
+    payload = os.urandom((3 << 20) + 777)
+    remote = tmp_path / 'remote.savf'
+    remote.write_bytes(payload)
+    digest = hashlib.sha256()
+
+    assert lib._saveLibrary__getSavFile(localFilePath=str(tmp_path / 'local.savf'), remotePath=str(remote),
+                                        port=sftp_port, digest=digest)
+    assert digest.hexdigest() == hashlib.sha256(payload).hexdigest()
+
+
+def test_stream_savf_digest(sftp_port, lib, tmp_path):
+    payload = os.urandom((2 << 20) + 99)
+    remote = tmp_path / 'remote.savf'
+    remote.write_bytes(payload)
+    local = tmp_path / 'local.savf'
+    digest = hashlib.sha256()
+
+    assert lib._saveLibrary__streamSavFile(localFilePath=str(local), remotePath=str(remote),
+                                           port=sftp_port, removeRemote=False, digest=digest)
+    assert local.read_bytes() == payload
+    assert digest.hexdigest() == hashlib.sha256(payload).hexdigest()
+    assert remote.exists()
+
+
+def test_remote_sha256_survives_closed_session(sftp_port, lib, tmp_path):
+    """
+    The remote checksum runs on its own connection, so closing the shared
+    session (as a failed download attempt does) does not affect it.
+    """
+    payload = os.urandom(4096)
+    remote = tmp_path / 'remote.savf'
+    remote.write_bytes(payload)
+    lib._get_sftp(sftp_port)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        checksum = executor.submit(lib._saveLibrary__remoteSha256, str(remote), sftp_port)
+        with lib._sftp_lock:
+            lib._close_sftp()
+        assert checksum.result() == hashlib.sha256(payload).hexdigest()
+
+
+def test_get_savf_empty_file(sftp_port, lib, tmp_path):
+    remote = tmp_path / 'empty.savf'
+    remote.write_bytes(b'')
+    local = tmp_path / 'local.savf'
+
+    assert lib._saveLibrary__getSavFile(localFilePath=str(local), remotePath=str(remote), port=sftp_port)
+    assert local.read_bytes() == b''
+
+
+def test_get_savf_short_file(sftp_port, lib, tmp_path, monkeypatch):
+    """
+    A remote file shorter than its reported size raises the non-retryable
+    _ShortReadError instead of EOFError.
+    """
+    remote = tmp_path / 'remote.savf'
+    remote.write_bytes(os.urandom(4096))
+    stat = paramiko.SFTPClient.stat
+
+    def larger_stat(self, path):
+        attributes = stat(self, path)
+        attributes.st_size += 100
+        return attributes
+
+    monkeypatch.setattr(paramiko.SFTPClient, 'stat', larger_stat)
+
+    with pytest.raises(save_module._ShortReadError):
+        lib._saveLibrary__getSavFile(localFilePath=str(tmp_path / 'local.savf'), remotePath=str(remote),
+                                     port=sftp_port)
+
+
+def test_get_savf_missing_file(sftp_port, lib, tmp_path):
+    local = tmp_path / 'local.savf'
+
+    assert not lib._saveLibrary__getSavFile(localFilePath=str(local),
+                                            remotePath=str(tmp_path / 'missing.savf'), port=sftp_port)
+
+
+# ---------------------------------------------
+# saveLibrary result
+# ---------------------------------------------
+@pytest.fixture
+def connected_lib(lib):
+    """
+    A Library whose database calls all succeed, without an IBM i behind it.
+    """
+    lib.conn = MagicMock()
+    lib.cursor = MagicMock()
+    yield lib
+    lib.conn = None
+    lib.cursor = None
+
+
+def test_save_library_retries_broken_download(connected_lib, tmp_path, monkeypatch):
+    download = MagicMock(side_effect=[paramiko.sftp.SFTPError('Garbage packet received'), EOFError(), True])
+    monkeypatch.setattr(connected_lib, '_saveLibrary__getSavFile', download)
+    monkeypatch.setattr(connected_lib, '_get_sftp', MagicMock())
+
+    assert connected_lib.saveLibrary(library='MYLIB', saveFileName='MYSAVF', getZip=True,
+                                     localPath=str(tmp_path)) is True
+    assert download.call_count == 3
+
+
+@pytest.mark.parametrize('error', [PermissionError('Permission denied'), OSError(28, 'No space left on device')])
+def test_save_library_returns_false_on_download_error(connected_lib, tmp_path, monkeypatch, error):
+    download = MagicMock(side_effect=error)
+    monkeypatch.setattr(connected_lib, '_saveLibrary__getSavFile', download)
+    monkeypatch.setattr(connected_lib, '_get_sftp', MagicMock())
+
+    assert connected_lib.saveLibrary(library='MYLIB', saveFileName='MYSAVF', getZip=True,
+                                     localPath=str(tmp_path)) is False
+    assert download.call_count == 1
+
+
+def test_save_library_does_not_retry_short_file(connected_lib, tmp_path, monkeypatch):
+    download = MagicMock(side_effect=save_module._ShortReadError('Unexpected end'))
+    monkeypatch.setattr(connected_lib, '_saveLibrary__getSavFile', download)
+    monkeypatch.setattr(connected_lib, '_get_sftp', MagicMock())
+
+    assert connected_lib.saveLibrary(library='MYLIB', saveFileName='MYSAVF', getZip=True,
+                                     localPath=str(tmp_path)) is False
+    assert download.call_count == 1
+
+
+def test_save_libraries_keeps_going_after_a_failure(lib, monkeypatch):
+    results = {'GOOD': True, 'BAD': RuntimeError('connection lost')}
+
+    def save_library(self, library, **kwargs):
+        result = results[library]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(Library, '__enter__', lambda self: self)
+    monkeypatch.setattr(Library, 'saveLibrary', save_library)
+
+    assert lib.saveLibraries([{'library': 'GOOD'}, {'library': 'BAD'}, {'library': 'GOOD'}],
+                             max_workers=2) == [True, False, True]
+
+
+def test_save_libraries_invalidates_parent_cache(lib, monkeypatch):
+    """
+    The workers have caches of their own, so the caller's cached infos of the
+    target libraries are dropped once the batch is done.
+    """
+    lib._info_cache[('GOOD', True)] = (float('inf'), 'stale')
+    lib._info_cache[('TARGET', True)] = (float('inf'), 'stale')
+    lib._info_cache[('OTHER', True)] = (float('inf'), 'kept')
+    monkeypatch.setattr(Library, '__enter__', lambda self: self)
+    monkeypatch.setattr(Library, 'saveLibrary', lambda self, **kwargs: True)
+
+    lib.saveLibraries([{'library': 'good'}, {'library': 'SRC', 'toLibrary': 'target'}])
+
+    assert list(lib._info_cache) == [('OTHER', True)]
+
+
+def test_save_library_keeps_savf_when_copy_fails(connected_lib, tmp_path, monkeypatch):
+    qcmdexc_cursor = MagicMock()
+    qcmdexc_cursor.execute.side_effect = pyodbc.Error('HY000', 'CPFA0A9 Object not found.')
+    connected_lib.conn.cursor.return_value = qcmdexc_cursor
+    remove_stale = MagicMock()
+    monkeypatch.setattr(connected_lib, '_saveLibrary__removeStaleSavf', remove_stale)
+    download = MagicMock(return_value=True)
+    monkeypatch.setattr(connected_lib, '_saveLibrary__getSavFile', download)
+    monkeypatch.setattr(connected_lib, '_get_sftp', MagicMock())
+
+    assert connected_lib.saveLibrary(library='MYLIB', saveFileName='MYSAVF', getZip=True,
+                                     localPath=str(tmp_path), remPath='/tmp') is False
+    assert 'CPYTOSTMF' in qcmdexc_cursor.execute.call_args[0][1][0]
+    remove_stale.assert_not_called()
+    download.assert_not_called()
+
+
+def test_save_library_removes_savf_when_savlib_fails(connected_lib, tmp_path, monkeypatch):
+    connected_lib.cursor.execute.side_effect = pyodbc.Error('HY000', 'CPF3777 Not all objects saved.')
+    remove_stale = MagicMock()
+    monkeypatch.setattr(connected_lib, '_saveLibrary__removeStaleSavf', remove_stale)
+
+    assert connected_lib.saveLibrary(library='MYLIB', saveFileName='MYSAVF') is False
+    remove_stale.assert_called_once_with('MYLIB', 'MYSAVF')
+
+
+def test_run_save_falls_back_silently(connected_lib, capsys):
+    """
+    Without the authority to create QTEMP.ILIBSAVE, the commands run as a
+    compound statement and nothing is reported.
+    """
+    def execute(sql, *params):
+        if sql.lstrip().startswith('CREATE'):
+            raise pyodbc.Error('42501', 'Not authorized to object ILIBSAVE in QTEMP.')
+
+    connected_lib.cursor.execute.side_effect = execute
+
+    connected_lib._saveLibrary__runSave('CRTSAVF FILE(A/B)', 'SAVLIB LIB(A)')
+    connected_lib._saveLibrary__runSave('CRTSAVF FILE(A/C)', 'SAVLIB LIB(A)')
+
+    assert connected_lib._procedure_installed is False
+    statements = [call[0][0] for call in connected_lib.cursor.execute.call_args_list]
+    assert sum(statement.lstrip().startswith('CREATE') for statement in statements) == 1
+    assert statements[-1].startswith('BEGIN CALL QSYS2.QCMDEXC(')
+    assert capsys.readouterr().out == ''